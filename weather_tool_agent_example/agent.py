@@ -1,24 +1,53 @@
 # This script demonstrates how to create a simple weather tool agent using the Google Gemini API.
-from google.adk.agents import Agent
+# The ADK/genai imports live next to the code that uses them, so the tools below can be used without loading ADK.
 from zoneinfo import ZoneInfo
 import datetime
-from google.adk.sessions import InMemorySessionService
-from google.adk.runners import Runner
 import asyncio
-from google.genai import types
+import re
+import string
+import sys
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Mapping, Optional
+from uuid import uuid4
 
 import warnings
-warnings.filterwarnings("ignore")
-
 import logging
 import os
 from dotenv import load_dotenv
-logging.basicConfig(level=logging.ERROR)
 
-print("Libraries imported successfully from agent.py...")
-load_dotenv()
+if TYPE_CHECKING:
+    from google.adk.models import Gemini
+    from google.adk.runners import Runner
+    from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+def _bootstrap():
+    """Process-wide setup for running this file as a script; importing the module has no such side effects."""
+    warnings.filterwarnings("ignore")
+    logging.basicConfig(level=logging.ERROR)
+    load_dotenv()
+    logger.debug("Libraries imported successfully from agent.py...")
 
 ######################################## 1. Define the Tool  ########################################
+# Lookup tables are built once at import instead of on every tool call
+# Lowercases ASCII letters and drops spaces in a single pass, e.g. "New York" -> "newyork"
+_NORMALIZE = str.maketrans({c: c.lower() for c in string.ascii_uppercase} | {" ": None})
+
+_WEATHER_DB: Mapping[str, dict] = MappingProxyType({
+    "newyork": {"status": "success", "report": "The weather in New York is sunny with a temperature of 25 degrees Celsius."},
+    "london": {"status": "success", "report": "It's cloudy in London with a temperature of 15° Celsius."},
+    "tokyo": {"status": "success", "report": "Tokyo is experiencing light rain and a temperature of 18°C."},
+})
+
+def _not_found(city: str) -> dict:
+    return {
+        "status": "error",
+        "error_message": f"Weather information for '{city}' is not available."
+    }
+
 def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city.
     Args:
@@ -29,21 +58,9 @@ def get_weather(city: str) -> dict:
         If 'status' is 'error', it contains 'error_message' key with the error details.
     """
     print(f"--- Tool: Executing get_weather tool for city: {city} ---")
-    city_normalized = city.lower().replace(" ", "")
-    mock_weather_db = {
-        "newyork": {"status": "success", "report": "The weather in New York is sunny with a temperature of 25 degrees Celsius."},
-        "london": {"status": "success", "report": "It's cloudy in London with a temperature of 15° Celsius."},
-        "tokyo": {"status": "success", "report": "Tokyo is experiencing light rain and a temperature of 18°C."} 
-    }
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return {
-            "status": "error",
-            "error_message": f"Weather information for '{city}' is not available."
-        }
-# print(get_weather("New York"))
-# print(get_weather("Paris"))
+    report = _WEATHER_DB.get(city.translate(_NORMALIZE))
+    # Return a copy so callers cannot modify the shared table entries
+    return dict(report) if report is not None else _not_found(city)
 
 ######################################## Define Tools for Sub-Agents  ########################################
 def say_hello(name: str = "there") -> dict:
@@ -65,6 +82,18 @@ def say_goodbye() -> str:
     return "Goodbye! Have a great day!"
 
 
+_TZ_MAP: Mapping[str, str] = MappingProxyType({
+    "newyork": "America/New_York",
+    "london": "Europe/London", # Added London for example
+    "tokyo": "Asia/Tokyo",
+    # Add more cities and their ZoneInfo identifiers here
+})
+
+@lru_cache(maxsize=None)
+def _zone(tz_identifier: str) -> ZoneInfo:
+    # Parse each zone's tzdata once per process
+    return ZoneInfo(tz_identifier)
+
 def get_current_time(city: str) -> dict:
     """Retrieves the current time in a specified city.
     Args:
@@ -74,20 +103,15 @@ def get_current_time(city: str) -> dict:
     """
     print(f"--- Tool: Executing get_current_time tool for city: {city} ---") # Added print
     # Simplified city check for demonstration
-    if city.lower().replace(" ", "") == "newyork":
-        tz_identifier = "America/New_York"
-    elif city.lower().replace(" ", "") == "london":
-         tz_identifier = "Europe/London" # Added London for example
-    # Add more cities and their ZoneInfo identifiers here
-    # e.g., elif city.lower().replace(" ", "") == "tokyo": tz_identifier = "Asia/Tokyo"
-    else:
+    tz_identifier = _TZ_MAP.get(city.translate(_NORMALIZE))
+    if tz_identifier is None:
         return {
             "status": "error",
             "error_message": f"Sorry, I don't have the current time for '{city}'."
         }
 
     try:
-        tz= ZoneInfo(tz_identifier)
+        tz = _zone(tz_identifier)
         now = datetime.datetime.now(tz)
         report = (
             f"The current time in {city} is {now.strftime('%Y-%m-%d %H:%M:%S %Z%z')}."
@@ -104,10 +128,11 @@ def get_current_time(city: str) -> dict:
 
 
 ######################################## 2. Define the Agent  ########################################
-AGENT_MODEL = os.getenv("MODEL_GEMINI_2_0_FLASH", "gemini-1.5-flash-latest")
-if not AGENT_MODEL:
-    print("Warning: MODEL_GEMINI_2_0_FLASH not found in .env, using default 'gemini-1.5-flash-latest'")
-    AGENT_MODEL = "gemini-1.5-flash-latest"
+@lru_cache(maxsize=None)
+def _llm(model: str) -> "Gemini":
+    # One Gemini instance per model name, so every agent on that model reuses its API client and connection pool
+    from google.adk.models import Gemini
+    return Gemini(model=model)
 
 # root_agent = Agent(
 #     name="weather_agent_v1", # You can keep the original name as well
@@ -123,127 +148,243 @@ if not AGENT_MODEL:
 # )
 # print(f"Agent '{root_agent.name}' created using model '{AGENT_MODEL}' in agent.py.")
 
-# --- Greeting Agent ---
-greeting_agent = None
-try:
+# Agent instructions, shared by every Agent built from them
+_GREETING_INSTRUCTION = ("You are the Greeting Agent. Your ONLY task is to provide a friendly greeting to the user. "
+                         "Use the 'say_hello' tool to generate the greeting. "
+                         "If the user provides their name, make sure to pass it to the tool. "
+                         "Do not engage in any other conversation or tasks.")
+_FAREWELL_INSTRUCTION = ("You are the Farewell Agent. Your ONLY task is to provide a polite goodbye to the user. "
+                         "Use the 'say_goodbye' tool to generate the goodbye message. "
+                         "Do not engage in any other conversation or tasks.")
+_ROOT_INSTRUCTION = ("You are the main Weather Agent coordinating a team. Your primary responsibility is to provide weather information. "
+                     "Use the 'get_weather' tool ONLY for specific weather requests (e.g., 'weather in London'). "
+                     "You have specialized sub-agents: "
+                     "1. 'greeting_agent': Handles simple greetings like 'Hi', 'Hello'. Delegate to it for these. "
+                     "2. 'farewell_agent': Handles simple farewells like 'Bye', 'See you'. Delegate to it for these. "
+                     "Analyze the user's query. If it's a greeting, delegate to 'greeting_agent'. If it's a farewell, delegate to 'farewell_agent'. "
+                     "If it's a weather request, handle it yourself using 'get_weather'. "
+                     "For anything else, respond appropriately or state you cannot handle it.")
+
+@lru_cache(maxsize=1)
+def make_root_agent():
+    """Builds the weather coordinator agent with its greeting and farewell sub-agents.
+    The agents are built once per process; later calls return the same root agent."""
+    from google.adk.agents import Agent
+
+    load_dotenv()
+    agent_model = os.getenv("MODEL_GEMINI_2_0_FLASH", "gemini-1.5-flash-latest")
+    if not agent_model:
+        print("Warning: MODEL_GEMINI_2_0_FLASH not found in .env, using default 'gemini-1.5-flash-latest'")
+        agent_model = "gemini-1.5-flash-latest"
+
+    # --- Greeting Agent ---
     greeting_agent = Agent(
         name="greeting_agent",
-        model="gemini-1.5-flash-latest",
-        instruction="You are the Greeting Agent. Your ONLY task is to provide a friendly greeting to the user. "
-                    "Use the 'say_hello' tool to generate the greeting. "
-                    "If the user provides their name, make sure to pass it to the tool. "
-                    "Do not engage in any other conversation or tasks.",
+        model=_llm("gemini-1.5-flash-latest"),
+        instruction=_GREETING_INSTRUCTION,
         description="Handles simple greetings and hellos using the 'say_hello' tool.", # Crucial for delegation
-        tools=[say_hello], # Assuming say_hello is defined elsewhere
+        tools=[say_hello],
     )
-    print(f"Greeting agent '{greeting_agent.name}' created successfully.")
-except Exception as e:
-    print(f"Error creating greeting agent: {e}")
 
-# --- Farewell Agent ---
-farewell_agent = None
-try:
+    # --- Farewell Agent ---
     farewell_agent = Agent(
         name="farewell_agent",
-        model="gemini-1.5-flash-latest",
-        instruction="You are the Farewell Agent. Your ONLY task is to provide a polite goodbye to the user. "
-                    "Use the 'say_goodbye' tool to generate the goodbye message. "
-                    "Do not engage in any other conversation or tasks.",
+        model=_llm("gemini-1.5-flash-latest"),
+        instruction=_FAREWELL_INSTRUCTION,
         description="Handles simple goodbyes using the 'say_goodbye' tool.", # Crucial for delegation
-        tools=[say_goodbye], # Assuming say_goodbye is defined elsewhere
+        tools=[say_goodbye],
     )
-    print(f"Farewell agent '{farewell_agent.name}' created successfully.")
-except Exception as e:
-    print(f"Error creating farewell agent: {e}")
-
-root_agent = None
-runner_root = None # Initialize runner
 
-if greeting_agent and farewell_agent and 'get_weather' in globals():
     root_agent = Agent(
-            name="weather_agent_v2", # Give it a new version name
-            model=AGENT_MODEL,
-            description="The main coordinator agent. Handles weather requests and delegates greetings/farewells to specialists.",
-            instruction="You are the main Weather Agent coordinating a team. Your primary responsibility is to provide weather information. "
-                        "Use the 'get_weather' tool ONLY for specific weather requests (e.g., 'weather in London'). "
-                        "You have specialized sub-agents: "
-                        "1. 'greeting_agent': Handles simple greetings like 'Hi', 'Hello'. Delegate to it for these. "
-                        "2. 'farewell_agent': Handles simple farewells like 'Bye', 'See you'. Delegate to it for these. "
-                        "Analyze the user's query. If it's a greeting, delegate to 'greeting_agent'. If it's a farewell, delegate to 'farewell_agent'. "
-                        "If it's a weather request, handle it yourself using 'get_weather'. "
-                        "For anything else, respond appropriately or state you cannot handle it.",
-            tools=[get_weather], # Root agent still needs the weather tool for its core task
-            # Key change: Link the sub-agents here!
-            sub_agents=[greeting_agent, farewell_agent]
-        )
-    print(f"Root Agent '{root_agent.name}' created using model '{AGENT_MODEL}' with sub-agents: {[sa.name for sa in root_agent.sub_agents]}")
-else:
-    print("Cannot create root agent because one or more sub-agents failed to initialize or 'get_weather' tool is missing.")
-    if not greeting_agent: print(" - Greeting Agent is missing.")
-    if not farewell_agent: print(" - Farewell Agent is missing.")
-    if 'get_weather' not in globals(): print(" - get_weather function is missing.")
+        name="weather_agent_v2", # Give it a new version name
+        model=_llm(agent_model),
+        description="The main coordinator agent. Handles weather requests and delegates greetings/farewells to specialists.",
+        instruction=_ROOT_INSTRUCTION,
+        tools=[get_weather], # Root agent still needs the weather tool for its core task
+        # Key change: Link the sub-agents here!
+        sub_agents=[greeting_agent, farewell_agent]
+    )
+    logger.debug("Root Agent '%s' created using model '%s' with sub-agents: %s", root_agent.name, agent_model, [sa.name for sa in root_agent.sub_agents])
+    return root_agent
 
+def _root_agent():
+    # Used only for the module attribute, where a failed build is logged and exposed as None
+    try:
+        return make_root_agent()
+    except Exception:
+        logger.exception("Cannot create root agent.")
+        return None
+
+def __getattr__(name: str):
+    # root_agent is built on first access (e.g. when `adk run` / `adk web` load this module), not at import
+    if name == "root_agent":
+        return _root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 
-####################################### 3. Setup Runner and Session Service  ######################################
 
-session_service = InMemorySessionService()
+####################################### 3. Setup Runner and Session Service  ######################################
 APP_NAME = "weather_tutorial_app"
 USER_ID = "user_1"
-SESSION_ID = "session_001"
+SESSION_ID = "session_001" # Session used by the demo conversation
 
-# Create the specific session where the conversation will happen
-session = session_service.create_session(
-    app_name=APP_NAME,
-    user_id=USER_ID,
-    session_id=SESSION_ID
-)
-print(f"Session created: App='{APP_NAME}', User='{USER_ID}', Session='{SESSION_ID}' in agent.py.")
+@lru_cache(maxsize=1)
+def _runner() -> "Runner":
+    """Builds the process-wide Runner and its InMemorySessionService on first use."""
+    from google.adk.sessions import InMemorySessionService
+    from google.adk.runners import Runner
 
-runner = Runner(
-    agent=root_agent, # Use the renamed 'root_agent' here
-    app_name=APP_NAME,
-    session_service=session_service,
-)
-print(f"Runner created for agent '{runner.agent.name}' in agent.py.")
+    runner = Runner(
+        agent=make_root_agent(), # Build errors propagate to the caller instead of yielding Runner(agent=None)
+        app_name=APP_NAME,
+        session_service=InMemorySessionService(),
+    )
+    logger.debug("Runner created for agent '%s' in agent.py.", runner.agent.name)
+    return runner
 
 ######################################## 4. Interact with the Agent  ########################################
-async def call_agent_async(query: str):
-    """Asynchronously calls the agent with a user query and returns the response."""
-    print(f"\n--- Calling agent with query: '{query}' from agent.py ---")
-    content = types.Content(
+# Final responses keyed on the normalized query text, so repeated queries skip the LLM roundtrip.
+# Least recently used entries are evicted beyond _RESPONSE_CACHE_SIZE.
+_RESPONSE_CACHE_SIZE = 256
+_RESPONSE_CACHE: "OrderedDict[str, str]" = OrderedDict()
+
+_GREETINGS = frozenset({"hi", "hello", "hey"})
+_FAREWELLS = frozenset({"bye", "goodbye", "see you"})
+# Cities from _WEATHER_DB as they are written in a query, with their spaces
+_WEATHER_CITIES = ("new york", "london", "tokyo")
+_WEATHER_QUERY = re.compile(
+    r"^(?:what(?:'s| is) the weather(?: like)?|tell me the weather|how is the weather|weather) in "
+    r"(?P<city>" + "|".join(re.escape(city) for city in _WEATHER_CITIES) + r")[?.!]?$"
+)
+
+def _fast_path_response(query: str) -> Optional[str]:
+    """Answers trivially-classifiable queries locally, returning None when the full agent is needed."""
+    query_normalized = query.strip(" !.?").lower()
+    if query_normalized in _GREETINGS:
+        return say_hello()
+    if query_normalized in _FAREWELLS:
+        return say_goodbye()
+    # Only answer locally when the whole query is a plain weather question about one known city;
+    # anything else (other cities, comparisons, follow-ups) goes to the agent
+    match = _WEATHER_QUERY.match(" ".join(query.lower().split()))
+    if match:
+        return get_weather(match.group("city"))["report"]
+    return None
+
+@lru_cache(maxsize=256)
+def _content_for(query: str) -> "types.Content":
+    # Reuse the user message for repeated queries instead of rebuilding it
+    from google.genai import types
+    return types.Content(
         role='user',
         parts=[types.Part(text=query)]
     )
 
+async def call_agent_async(query: str, session_id: Optional[str] = None, stream: bool = False):
+    """Asynchronously calls the agent with a user query and returns the response.
+    A new session is created for the query unless the id of an existing session is given.
+    With stream=True the response text is written to stdout as it arrives; leave it off for concurrent calls."""
+    logger.debug("--- Calling agent with query: '%s' from agent.py ---", query)
+    # The response cache and fast path ignore conversation history, so they only serve fresh sessions
+    standalone = session_id is None
+    cache_key = query.strip().lower()
+    if standalone:
+        cached_response = _RESPONSE_CACHE.get(cache_key)
+        if cached_response is not None:
+            _RESPONSE_CACHE.move_to_end(cache_key)
+            print(f"<<< Agent Response to '{query}' (cached): {cached_response}")
+            return cached_response
+
+        fast_response = _fast_path_response(query)
+        if fast_response is not None:
+            print(f"<<< Agent Response to '{query}': {fast_response}")
+            return fast_response
+
+    content = _content_for(query)
+    runner = _runner()
+    if session_id is None:
+        session_id = f"s{uuid4().hex}"
+        runner.session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+        logger.debug("Session created: App='%s', User='%s', Session='%s' in agent.py.", APP_NAME, USER_ID, session_id)
+
     final_response_text = "Agent did not produce a final response."
-    event_count = 0
-
-    async for event in runner.run_async(user_id=USER_ID, session_id=SESSION_ID, new_message=content):
-        print(f"  [Event] Author: {event.author}, Type: {type(event).__name__}, Final: {event.is_final_response()}, Content: {event.content}")
-        # Key Concept: is_final_response() marks the concluding message for the turn.
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                # Assuming text response in the first part
-                final_response_text = event.content.parts[0].text
-            elif event.actions and event.actions.escalate: # Handle potential errors/escalations
-                final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
-            # Add more checks here if needed (e.g., specific error codes)
-            break # Stop processing events once the final response is found
-
-    print(f"<<< Agent Response: {final_response_text}")
-    
+    streamed = False
+
+    run_kwargs = {}
+    if stream:
+        from google.adk.agents.run_config import RunConfig, StreamingMode
+        # Only override the runner's default RunConfig when streaming
+        run_kwargs["run_config"] = RunConfig(streaming_mode=StreamingMode.SSE)
+
+    events = runner.run_async(user_id=USER_ID, session_id=session_id, new_message=content, **run_kwargs)
+    try:
+        async for event in events:
+            logger.debug("  [Event] Author: %s, Type: %s, Final: %s, Content: %s", event.author, type(event).__name__, event.is_final_response(), event.content)
+            # Partial events carry streamed chunks of the response text
+            if event.partial and event.content and event.content.parts and event.content.parts[0].text:
+                if not streamed:
+                    sys.stdout.write(f"<<< Agent Response to '{query}': ")
+                    streamed = True
+                sys.stdout.write(event.content.parts[0].text)
+                sys.stdout.flush()
+                continue
+            # Key Concept: is_final_response() marks the concluding message for the turn.
+            if event.is_final_response():
+                if event.content and event.content.parts:
+                    # Assuming text response in the first part
+                    final_response_text = event.content.parts[0].text
+                    if final_response_text and standalone:
+                        _RESPONSE_CACHE[cache_key] = final_response_text
+                        if len(_RESPONSE_CACHE) > _RESPONSE_CACHE_SIZE:
+                            _RESPONSE_CACHE.popitem(last=False)
+                elif event.actions and event.actions.escalate: # Handle potential errors/escalations
+                    final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
+                # Add more checks here if needed (e.g., specific error codes)
+                break # Stop processing events once the final response is found
+    finally:
+        # Closing the generator abandons any work the runner would do after the final response
+        await events.aclose()
+
+    if streamed:
+        print()
+    else:
+        print(f"<<< Agent Response to '{query}': {final_response_text}")
+    return final_response_text
+
+async def call_agent_batch_async(queries: list[str]) -> list[str]:
+    """Asynchronously calls the agent with several independent queries and returns their responses in order."""
+    # The root agent relies on tool calls and sub-agent delegation, which Gemini's batch mode cannot drive,
+    # so each query runs through the runner concurrently in its own session instead.
+    return list(await asyncio.gather(*(call_agent_async(query) for query in queries)))
+
+def run_batch(queries: list[str]) -> list[str]:
+    """Synchronous wrapper around call_agent_batch_async."""
+    return asyncio.run(call_agent_batch_async(queries))
+
 ######################################## 5. Run the Conversation  ########################################
 
 async def run_conversation():
-    await call_agent_async("What is the weather like in London?")
-    await call_agent_async("How about Paris?") # Expecting the tool's error message
-    await call_agent_async("Tell me the weather in New York")
+    queries = [
+        "What is the weather like in London?",
+        "How about Paris?", # Expecting the tool's error message
+        "Tell me the weather in New York",
+    ]
+    # "How about Paris?" follows up on the London question, so the turns run in order in one session
+    _runner().session_service.create_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+    logger.debug("Session created: App='%s', User='%s', Session='%s' in agent.py.", APP_NAME, USER_ID, SESSION_ID)
+    for query in queries:
+        await call_agent_async(query, SESSION_ID)
 
 
 # --- EXECUTION ---
 if __name__ == "__main__":
+    _bootstrap()
+    try:
+        import uvloop # Optional: faster event loop, not available on Windows
+        uvloop.install()
+    except ImportError:
+        pass
     try:
         asyncio.run(run_conversation())
     except Exception as e: